@@ -1,32 +1,159 @@
-import argparse
+import functools
+import hashlib
 import os
+import pickle
+import re
+import tempfile
+import time
 import sys
-from urllib.parse import urlparse
-import gzip
-import urllib.request
-from io import StringIO
-from collections import deque
-
-try:
-    import yaml
-except ImportError:
-    print("Ошибка: требуется библиотека PyYAML. Установите ее: pip install pyyaml")
-    sys.exit(2)
+from urllib.parse import urljoin, urlparse
+from io import StringIO, TextIOWrapper
+from collections import OrderedDict
 
 
 DEFAULT_CONFIG = "config_valid.yaml"
+USAGE = "usage: Conf.py [-h] [-c CONFIG]"
+HELP = """Граф зависимостей пакетов (Этап 3).
+
+options:
+  -h, --help            показать эту справку и выйти
+  -c CONFIG, --config CONFIG
+                        Путь к YAML-конфигу"""
+# Длинные параметры; префиксы не пересекаются, поэтому сокращения однозначны
+LONG_OPTIONS = ("--config", "--help")
+# Сколько байт конфига читать, прежде чем разбирать файл целиком
+CONFIG_HEAD_SIZE = 16384
+# Имя пакета в начале строки или после ',' / '|'; версии и архитектуры отбрасываются
+DEPENDS_RE = re.compile(r"(?:^|[,|])\s*([A-Za-z0-9][A-Za-z0-9+.\-]*)")
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "confuprpractice")
+MAX_REDIRECTS = 5
+# Сколько секунд доверять закэшированному результату проверки существования пути
+PATH_CACHE_TTL = 5.0
+# LRU-кэш проверок пути (не более PATH_CACHE_SIZE записей): путь -> (существует, время проверки)
+PATH_CACHE_SIZE = 1024
+PATH_EXISTS_CACHE = OrderedDict()
+# Пул keep-alive соединений: (схема, хост) -> http.client.HTTPConnection
+HTTP_CONNECTIONS = {}
+
+
+def yaml_load(data):
+    """
+    Разбирает YAML. PyYAML импортируется только при первом вызове,
+    модуль и загрузчик сохраняются в атрибутах функции.
+    """
+    if yaml_load.loader is None:
+        try:
+            import yaml
+        except ImportError:
+            print("Ошибка: требуется библиотека PyYAML. Установите ее: pip install pyyaml")
+            sys.exit(2)
+        yaml_load.yaml = yaml
+        # C-загрузчик libyaml заметно быстрее чистого Python SafeLoader
+        yaml_load.loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml_load.yaml.load(data, Loader=yaml_load.loader)
+
+
+yaml_load.yaml = None
+yaml_load.loader = None
+
+
+def _parse_config_head(head, rest):
+    """
+    Пробует разобрать только начало большого файла конфигурации.
+    Возвращает None, если этого недостаточно и нужен полный разбор: в начале
+    нет всех ключей схемы или в остатке файла ключ схемы встречается снова
+    (в YAML действует последнее значение).
+    Синтаксические ошибки YAML за пределами начала файла при этом не обнаруживаются.
+    """
+    # Отрезаем незаконченную последнюю строку
+    cut = head.rfind(b"\n") + 1
+    if CONFIG_KEY_LINE_RE.search(head[cut:] + rest):
+        return None
+    try:
+        cfg = yaml_load(head[:cut])
+    except Exception:
+        return None
+    if not isinstance(cfg, dict) or any(key not in cfg for key in CONFIG_KEYS):
+        return None
+    return cfg
+
+
+def _cache_path(name):
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, digest + ".pkl")
+
+
+def _file_cache_entry(kind, st, path):
+    """
+    Возвращает (файл кэша, ключ) для содержимого локального файла.
+    Ключ меняется вместе с временем изменения и размером файла.
+    """
+    abs_path = os.path.abspath(path)
+    key = (abs_path, st.st_mtime_ns, st.st_size)
+    return _cache_path(kind + ":" + abs_path), key
+
+
+def _read_cache(cache_file, key):
+    """
+    Возвращает закэшированное значение, если ключ совпадает, иначе None.
+    """
+    try:
+        with open(cache_file, "rb") as f:
+            cached_key, value = pickle.load(f)
+    except Exception:
+        return None
+    if cached_key != key:
+        return None
+    return value
+
+
+def _write_cache(cache_file, key, value):
+    """
+    Атомарно записывает значение в кэш. Ошибки записи игнорируются.
+    """
+    tmp_path = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_file)
+    except Exception:
+        # Не оставляем в каталоге кэша недописанные временные файлы
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
 
 
 def load_config(path):
-    if not os.path.exists(path):
+    try:
+        st = os.stat(path)
+    except OSError:
         raise FileNotFoundError(f"Файл конфигурации не найден: {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        try:
-            cfg = yaml.safe_load(f)
-        except Exception as e:
-            raise ValueError(f"Ошибка парсинга YAML: {e}")
+    cache_file, key = _file_cache_entry("config", st, path)
+    cfg = _read_cache(cache_file, key)
+    if cfg is not None:
+        return cfg
+
+    # Отдаем загрузчику байты: UTF-8/BOM декодируются внутри libyaml
+    with open(path, "rb") as f:
+        head = f.read(CONFIG_HEAD_SIZE)
+        cfg = None
+        if len(head) == CONFIG_HEAD_SIZE:
+            rest = f.read()
+            cfg = _parse_config_head(head, rest)
+            if cfg is None:
+                head += rest
+        if cfg is None:
+            try:
+                cfg = yaml_load(head)
+            except Exception as e:
+                raise ValueError(f"Ошибка парсинга YAML: {e}")
     if cfg is None:
         raise ValueError("Файл конфигурации пуст.")
+    _write_cache(cache_file, key, cfg)
     return cfg
 
 
@@ -35,23 +162,53 @@ def validate_string(value, name):
         raise ValueError(f"Параметр '{name}' отсутствует.")
     if not isinstance(value, str):
         raise ValueError(f"Параметр '{name}' должен быть строкой.")
-    if value.strip() == "":
+    val = value.strip()
+    if not val:
         raise ValueError(f"Параметр '{name}' не должен быть пустым.")
+    return val
+
+
+def validate_image_name(value, name):
+    val = validate_string(value, name)
+    if "." not in val:
+        raise ValueError(f"{name} должно содержать расширение файла.")
+    return val
+
+
+def path_exists(path):
+    """
+    os.path.exists с кэшированием результата на PATH_CACHE_TTL секунд.
+    Кэш ограничен PATH_CACHE_SIZE записями, вытесняются давно не использованные.
+    """
+    now = time.monotonic()
+    cached = PATH_EXISTS_CACHE.get(path)
+    if cached is not None and now - cached[1] < PATH_CACHE_TTL:
+        PATH_EXISTS_CACHE.move_to_end(path)
+        return cached[0]
+    result = os.path.exists(path)
+    PATH_EXISTS_CACHE[path] = (result, now)
+    PATH_EXISTS_CACHE.move_to_end(path)
+    if len(PATH_EXISTS_CACHE) > PATH_CACHE_SIZE:
+        PATH_EXISTS_CACHE.popitem(last=False)
+    return result
 
 
 def validate_url_or_path(value, name):
     if value is None:
         raise ValueError(f"Параметр '{name}' отсутствует.")
-    if not isinstance(value, str) or value.strip() == "":
+    val = value.strip() if isinstance(value, str) else ""
+    if not val:
         raise ValueError(f"Параметр '{name}' должен быть непустой строкой.")
-    val = value.strip()
-    # Проверить как путь
-    if os.path.exists(val):
-        return
-    # Проверить как URL
+    # Сначала дешевая проверка URL: для http(s)/ftp системный вызов не нужен
     parsed = urlparse(val)
+    if parsed.scheme in ("http", "https", "ftp") and parsed.netloc:
+        return val
+    # Проверить как путь (urlparse уже кэширует разбор сам)
+    if path_exists(val):
+        return val
+    # Прочие схемы URL
     if parsed.scheme and parsed.netloc:
-        return
+        return val
     raise ValueError(f"Параметр '{name}' не является существующим путем или корректным URL: {val}")
 
 
@@ -60,6 +217,11 @@ def validate_mode(value, name):
         raise ValueError(f"Параметр '{name}' отсутствует.")
     if not isinstance(value, str):
         raise ValueError(f"Параметр '{name}' должен быть строкой ('test' или 'repo').")
+    return _normalize_mode(value, name)
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_mode(value, name):
     val = value.strip().lower()
     if val not in ("test", "repo"):
         raise ValueError(f"Параметр '{name}' должен иметь значение 'test' или 'repo'.")
@@ -69,7 +231,15 @@ def validate_mode(value, name):
 def validate_int(value, name, minimum=0, maximum=None):
     if value is None:
         raise ValueError(f"Параметр '{name}' отсутствует.")
-    if isinstance(value, int):
+    # Кэшируем только хэшируемые скалярные значения
+    if type(value) in (int, str):
+        return _check_int_cached(value, name, minimum, maximum)
+    return _check_int(value, name, minimum, maximum)
+
+
+def _check_int(value, name, minimum, maximum):
+    # Точная проверка типа быстрее isinstance; bool и прочее идут через int()
+    if type(value) is int:
         n = value
     else:
         try:
@@ -83,49 +253,111 @@ def validate_int(value, name, minimum=0, maximum=None):
     return n
 
 
+_check_int_cached = functools.lru_cache(maxsize=1024, typed=True)(_check_int)
+
+
+# Схема конфигурации: (ключ, валидатор, доп. аргументы валидатора)
+CONFIG_SCHEMA = (
+    ("package_name", validate_string, {}),
+    ("repository", validate_url_or_path, {}),
+    ("mode", validate_mode, {}),
+    ("output_image", validate_image_name, {}),
+    ("max_depth", validate_int, {"minimum": 0, "maximum": 100}),
+)
+CONFIG_KEYS = tuple(key for key, _, _ in CONFIG_SCHEMA)
+# Ключ схемы в начале строки (верхний уровень YAML)
+CONFIG_KEY_LINE_RE = re.compile(
+    rb"^[\"']?(?:" + b"|".join(re.escape(key.encode()) for key in CONFIG_KEYS) + rb")[\"']?[ \t]*:",
+    re.M,
+)
+
+
 def print_kv(params):
-    for k in sorted(params.keys()):
-        print(f"{k}: {params[k]}")
+    if not params:
+        return
+    # Одна запись в stdout вместо отдельного print на каждый ключ
+    sys.stdout.write("\n".join(f"{k}: {params[k]}" for k in sorted(params)) + "\n")
 
 
-def extract_dependencies(packages_content, package_name):
+def build_packages_index(packages_content):
+    """
+    Строит индекс {имя пакета: (начало, конец)} строф файла Packages за один проход.
+    """
+    marker = "\nPackage: "
+    starts = [0] if packages_content.startswith("Package: ") else []
+    pos = packages_content.find(marker)
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = packages_content.find(marker, pos + 1)
+
+    index = {}
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(packages_content)
+        name_start = start + len("Package: ")
+        name_end = packages_content.find("\n", name_start, end)
+        if name_end == -1:
+            name_end = end
+        name = packages_content[name_start:name_end].strip()
+        # Как и при линейном поиске, учитывается первая строфа с таким именем
+        index.setdefault(name, (start, end))
+    return index
+
+
+def find_package_stanza(packages_content, package_name):
+    """
+    Находит строфу пакета одним поиском по тексту вместо обхода строк.
+    Имя сравнивается так же, как в build_packages_index: без пробелов по краям.
+    Возвращает (начало, конец) или None, если пакет не найден.
+    """
+    header = re.compile(r"^Package: [^\S\n]*" + re.escape(package_name) + r"[^\S\n]*$", re.M)
+    match = header.search(packages_content)
+    if match is None:
+        return None
+    start = match.start()
+    end = packages_content.find("\nPackage: ", start)
+    end = len(packages_content) if end == -1 else end + 1
+    return start, end
+
+
+def extract_dependencies(packages_content, package_name, index=None):
     """
     Извлекает прямые зависимости указанного пакета из содержимого файла Packages.
+    Если передан index (см. build_packages_index), строфа пакета берется из него,
+    иначе ищется через find_package_stanza. Разбирается только эта строфа.
     """
-    lines = iter(packages_content.splitlines())
-    current_package = None
+    if index is not None:
+        bounds = index.get(package_name)
+    else:
+        bounds = find_package_stanza(packages_content, package_name)
+    if bounds is None:
+        return []
+    start, end = bounds
     depends_line = None
 
-    for line in lines:
+    for line in StringIO(packages_content[start:end]):
         line = line.strip()
-
-        if line.startswith("Package: "):
-            current_package = line[len("Package: "):].strip()
-            depends_line = None
-        elif line.startswith("Depends: ") and current_package == package_name:
+        if line.startswith("Depends: "):
             depends_line = line[len("Depends: "):].strip()
             break
 
     if not depends_line:
         return []
 
-    # Разбор Depends: pkg1, pkg2 (>= ver), pkg3
-    dependencies = []
-    for dep in depends_line.split(','):
-        dep = dep.strip()
-        # Убираем версии и прочее
-        dep = dep.split()[0]
-        if dep:
-            dependencies.append(dep)
-
-    return dependencies
+    # Разбор Depends: pkg1, pkg2 (>= ver), pkg3 | pkg4
+    return DEPENDS_RE.findall(depends_line)
 
 
 def read_test_repo(test_file_path):
     """
     Читает тестовый файл и возвращает словарь зависимостей.
     Формат: A: B, C
+    Разобранный словарь кэшируется так же, как конфигурация.
     """
+    cache_file, key = _file_cache_entry("test_repo", os.stat(test_file_path), test_file_path)
+    deps_map = _read_cache(cache_file, key)
+    if deps_map is not None:
+        return deps_map
+
     deps_map = {}
     with open(test_file_path, 'r', encoding='utf-8') as f:
         for line in f:
@@ -138,9 +370,167 @@ def read_test_repo(test_file_path):
             pkg = pkg.strip()
             deps_list = [d.strip() for d in deps_str.split(',') if d.strip()]
             deps_map[pkg] = deps_list
+    _write_cache(cache_file, key, deps_map)
     return deps_map
 
 
+def _use_connection_pool(url):
+    """
+    Пул соединений используется только для http/https без прокси.
+    Остальные URL (ftp, запросы через http_proxy/https_proxy) идут через urllib.
+    """
+    import urllib.request
+
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return False
+    if parsed.scheme not in urllib.request.getproxies():
+        return True
+    return bool(urllib.request.proxy_bypass(parsed.netloc))
+
+
+def _urlopen(url, headers):
+    """
+    Открывает URL через urllib.request (прокси, ftp). Ответ 304 возвращается
+    как обычный ответ, а не исключение.
+    """
+    import urllib.error
+    import urllib.request
+
+    try:
+        return urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return e
+        raise
+
+
+def open_url(url, headers=None):
+    """
+    Выполняет GET-запрос: через пул keep-alive соединений, если это возможно,
+    иначе через urllib.request.
+    """
+    headers = dict(headers or {})
+    if _use_connection_pool(url):
+        return http_open(url, headers)
+    return _urlopen(url, headers)
+
+
+def _get_connection(scheme, netloc):
+    """
+    Возвращает постоянное (keep-alive) соединение с хостом, создавая его при необходимости.
+    """
+    import http.client
+
+    key = (scheme, netloc)
+    conn = HTTP_CONNECTIONS.get(key)
+    if conn is None:
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(netloc)
+        else:
+            conn = http.client.HTTPConnection(netloc)
+        HTTP_CONNECTIONS[key] = conn
+    return conn
+
+
+def _drop_connection(url):
+    """
+    Закрывает и убирает из пула соединение с хостом из URL. Нужно, если ответ
+    не был дочитан: иначе следующий запрос прочтет остаток старого тела.
+    """
+    parsed = urlparse(url or "")
+    conn = HTTP_CONNECTIONS.pop((parsed.scheme, parsed.netloc), None)
+    if conn is not None:
+        conn.close()
+
+
+def http_open(url, headers=None):
+    """
+    Выполняет GET-запрос через пул соединений и возвращает http.client.HTTPResponse.
+    Перенаправления выполняются автоматически. Ответ нужно дочитать до конца,
+    прежде чем отправлять следующий запрос тому же хосту.
+    """
+    import http.client
+
+    headers = dict(headers or {})
+    for _ in range(MAX_REDIRECTS + 1):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            raise ValueError(f"Неподдерживаемый URL: {url}")
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+
+        # Сервер мог закрыть простаивающее соединение: одна повторная попытка
+        for attempt in range(2):
+            conn = _get_connection(parsed.scheme, parsed.netloc)
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                break
+            except (http.client.HTTPException, OSError):
+                _drop_connection(url)
+                if attempt:
+                    raise
+
+        location = response.getheader("Location")
+        if response.status in (301, 302, 303, 307, 308) and location:
+            response.read()
+            url = urljoin(url, location)
+            if not _use_connection_pool(url):
+                return _urlopen(url, headers)
+            continue
+        # Как и в urllib: итоговый URL после перенаправлений
+        response.url = url
+        return response
+    raise ValueError(f"Слишком много перенаправлений: {url}")
+
+
+def fetch_text(url, gzipped=False):
+    """
+    Скачивает текстовый файл по URL, при необходимости распаковывая gzip.
+    Повторные запросы условные (If-None-Match / If-Modified-Since): при ответе
+    304 содержимое берется из локального кэша.
+    """
+    # Модуль gzip нужен только в режиме repo
+    import gzip
+
+    cache_file = _cache_path("url:" + url)
+    cached = _read_cache(cache_file, url)  # (etag, last_modified, content)
+    headers = {}
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    with open_url(url, headers) as response:
+        try:
+            # Для ftp статуса нет (None)
+            status = response.status
+            if status == 304 and cached is not None:
+                response.read()
+                return cached[2]
+            if status is not None and status != 200:
+                response.read()
+                raise ValueError(f"HTTP {status} {response.reason}: {url}")
+
+            # Распаковываем поток по мере загрузки, без копии сжатых данных
+            stream = gzip.GzipFile(fileobj=response) if gzipped else response
+            content = TextIOWrapper(stream, encoding='utf-8').read()
+        except Exception:
+            # Тело могло остаться недочитанным: keep-alive соединение больше не годится
+            _drop_connection(response.url)
+            raise
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    if etag or last_modified:
+        _write_cache(cache_file, url, (etag, last_modified, content))
+    return content
+
+
 def get_repo_packages_content(repo_url_or_path, mode):
     """
     Возвращает содержимое файла Packages (или словарь для теста).
@@ -152,90 +542,135 @@ def get_repo_packages_content(repo_url_or_path, mode):
         gz_url = packages_url + '.gz'
 
         try:
-            response = urllib.request.urlopen(gz_url)
-            content = gzip.decompress(response.read()).decode('utf-8')
-            return content
+            return fetch_text(gz_url, gzipped=True)
         except Exception:
             try:
-                response = urllib.request.urlopen(packages_url)
-                return response.read().decode('utf-8')
+                return fetch_text(packages_url)
             except Exception as e:
                 raise ValueError(f"Не удалось получить файл Packages: {e}")
 
 
-def build_dependency_graph_bfs(start_package, repo_data, max_depth):
+def build_dependency_graph_bfs(start_package, repo_data, max_depth, index=None):
     """
     Строит граф зависимостей с помощью BFS, ограничивая глубину и избегая циклов.
+    Граф обходится по уровням: frontier - пакеты текущей глубины.
+    index - готовый индекс build_packages_index; если не передан, строится здесь.
     """
-    visited = set()
+    visited = {start_package}
     graph = {}
-    queue = deque([(start_package, 0)])  # (package, depth)
+    frontier = [start_package]
+    depth = 0
+    # Индекс строится один раз, чтобы не сканировать файл для каждого пакета
+    if index is None and not isinstance(repo_data, dict):
+        index = build_packages_index(repo_data)
+
+    while frontier:
+        next_frontier = []
+        for pkg in frontier:
+            if index is None:  # Тестовый режим
+                deps = repo_data.get(pkg, [])
+            else:  # Репозиторий apt
+                deps = extract_dependencies(repo_data, pkg, index)
+            graph[pkg] = deps
+
+            if depth + 1 > max_depth:
+                continue
+            for dep in deps:
+                if dep not in visited:
+                    visited.add(dep)
+                    next_frontier.append(dep)
 
-    while queue:
-        current_pkg, depth = queue.popleft()
+        frontier = next_frontier
+        depth += 1
 
-        if depth > max_depth:
-            continue
+    return graph
 
-        if current_pkg in visited:
-            continue
 
-        visited.add(current_pkg)
+def parse_args(argv):
+    """
+    Разбирает аргументы командной строки и возвращает путь к конфигу.
+    Поддерживается единственный параметр -c/--config, поэтому argparse не нужен.
+    Как и в argparse, принимаются формы -c PATH, -cPATH, -c=PATH, --config PATH,
+    --config=PATH и сокращения длинных имен (--conf PATH).
+    """
+    config = DEFAULT_CONFIG
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg.startswith("--"):
+            name, sep, value = arg.partition("=")
+            option = _match_long_option(name)
+            if option is None:
+                usage_error(f"неизвестный аргумент: {arg}")
+            if option == "--help":
+                if sep:
+                    usage_error("аргумент -h/--help: значение не допускается")
+                print_help()
+        elif arg == "-h":
+            print_help()
+        elif arg.startswith("-c"):
+            value = arg[2:]
+            sep = value[:1]
+            if sep == "=":
+                value = value[1:]
+        else:
+            usage_error(f"неизвестный аргумент: {arg}")
+
+        if sep:
+            config = value
+        else:
+            # Значение - следующий аргумент, если он не похож на параметр
+            if i + 1 >= len(argv) or (argv[i + 1].startswith("-") and argv[i + 1] != "-"):
+                usage_error("аргумент -c/--config: ожидается один аргумент")
+            config = argv[i + 1]
+            i += 1
+        i += 1
+    return config
 
-        if isinstance(repo_data, dict):  # Тестовый режим
-            deps = repo_data.get(current_pkg, [])
-        else:  # Репозиторий apt
-            deps = extract_dependencies(repo_data, current_pkg)
 
-        graph[current_pkg] = deps
+def _match_long_option(name):
+    """
+    Возвращает полное имя длинного параметра по имени или его префиксу.
+    """
+    for option in LONG_OPTIONS:
+        if len(name) > 2 and option.startswith(name):
+            return option
+    return None
 
-        for dep in deps:
-            if dep not in visited and depth + 1 <= max_depth:
-                queue.append((dep, depth + 1))
 
-    return graph
+def print_help():
+    print(USAGE + "\n\n" + HELP)
+    sys.exit(0)
+
+
+def usage_error(message):
+    print(USAGE, file=sys.stderr)
+    print(f"Conf.py: ошибка: {message}", file=sys.stderr)
+    sys.exit(2)
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Граф зависимостей пакетов (Этап 3).")
-    parser.add_argument("-c", "--config", default=DEFAULT_CONFIG, help="Путь к YAML-конфигу")
-    args = parser.parse_args()
+    config_path = parse_args(sys.argv[1:])
 
     try:
-        cfg = load_config(args.config)
+        cfg = load_config(config_path)
     except Exception as e:
         print(f"Ошибка загрузки конфигурации: {e}")
         sys.exit(1)
 
+    # Валидация параметров за один проход по схеме
+    params = {}
     try:
-        # Валидация параметров
-        package_name = cfg.get("package_name")
-        validate_string(package_name, "package_name")
-
-        repo_url = cfg.get("repository")
-        validate_url_or_path(repo_url, "repository")
-
-        mode = validate_mode(cfg.get("mode"), "mode")
-
-        output_image = cfg.get("output_image")
-        validate_string(output_image, "output_image")
-        if "." not in output_image:
-            raise ValueError("output_image должно содержать расширение файла.")
-
-        max_depth = validate_int(cfg.get("max_depth"), "max_depth", minimum=0, maximum=100)
-
+        for key, validator, kwargs in CONFIG_SCHEMA:
+            params[key] = validator(cfg.get(key), key, **kwargs)
     except Exception as e:
         print(f"Ошибка валидации конфигурации: {e}")
         sys.exit(2)
 
-    # Параметры для вывода
-    params = {
-        "package_name": package_name,
-        "repository": repo_url,
-        "mode": mode,
-        "output_image": output_image,
-        "max_depth": max_depth,
-    }
+    package_name = params["package_name"]
+    repo_url = params["repository"]
+    mode = params["mode"]
+    max_depth = params["max_depth"]
 
     print("Параметры конфигурации:")
     print_kv(params)
@@ -247,9 +682,12 @@ def main():
 
     try:
         repo_data = get_repo_packages_content(repo_url, mode)
+        index = None
 
         if mode == "repo":
-            dependencies = extract_dependencies(repo_data, package_name)
+            # Один индекс на этапы 2 и 3: один проход по файлу и одинаковый поиск имен
+            index = build_packages_index(repo_data)
+            dependencies = extract_dependencies(repo_data, package_name, index)
             if dependencies:
                 print(f"Прямые зависимости пакета '{package_name}':")
                 for dep in dependencies:
@@ -275,7 +713,7 @@ def main():
     print("Этап 3: Построение графа зависимостей")
 
     try:
-        dependency_graph = build_dependency_graph_bfs(package_name, repo_data, max_depth)
+        dependency_graph = build_dependency_graph_bfs(package_name, repo_data, max_depth, index)
 
         print(f"\nГраф зависимостей (до глубины {max_depth}):")
         for pkg, deps in dependency_graph.items():